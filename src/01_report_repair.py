@@ -1,5 +1,104 @@
+import bisect
 import itertools
 import math
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+
+def k_sum(values, expected_sum, n_elements):
+  """
+  Lazily yields every distinct tuple of n_elements values (sorted ascending)
+  that sums expected_sum. A value can be picked as many times as it appears
+  in values.
+
+  Uses a hash set for pairs, sort plus two pointers for triplets and
+  meet-in-the-middle for larger tuples.
+  """
+  if n_elements < 1:
+    raise ValueError(f"n_elements must be positive, got {n_elements}")
+  if n_elements == 1:
+    return _one_sum(values, expected_sum)
+  if n_elements == 2:
+    return _two_sum(values, expected_sum)
+  if n_elements == 3:
+    return _three_sum(values, expected_sum)
+  return _meet_in_the_middle(values, expected_sum, n_elements)
+
+
+def _one_sum(values, expected_sum):
+  if expected_sum in set(values):
+    yield (expected_sum,)
+
+
+def _two_sum(values, expected_sum):
+  counts = Counter(values)
+  for v in sorted(counts):
+    complement = expected_sum - v
+    if complement < v:
+      break
+    if complement == v:
+      if counts[v] > 1:
+        yield (v, v)
+    elif complement in counts:
+      yield (v, complement)
+
+
+def _three_sum(values, expected_sum):
+  ordered = sorted(values)
+  n = len(ordered)
+  for i in range(n - 2):
+    if i > 0 and ordered[i] == ordered[i - 1]:
+      continue
+    lo = i + 1
+    hi = n - 1
+    while lo < hi:
+      total = ordered[i] + ordered[lo] + ordered[hi]
+      if total < expected_sum:
+        lo += 1
+      elif total > expected_sum:
+        hi -= 1
+      else:
+        yield (ordered[i], ordered[lo], ordered[hi])
+        lo += 1
+        while lo < hi and ordered[lo] == ordered[lo - 1]:
+          lo += 1
+        hi -= 1
+
+
+def _meet_in_the_middle(values, expected_sum, n_elements):
+  ordered = sorted(values)
+  n = len(ordered)
+  left_size = n_elements // 2
+  right_size = n_elements - left_size
+
+  # Right halves are stored by sum. combinations() emits them in lexicographic
+  # order, so each bucket is already sorted by its first index.
+  right_halves = defaultdict(list)
+  for pick in itertools.combinations(range(n), right_size):
+    right_halves[sum(ordered[i] for i in pick)].append(pick)
+  first_indexes = {s: [pick[0] for pick in picks] for s, picks in right_halves.items()}
+
+  for left in itertools.combinations(range(n), left_size):
+    remaining = expected_sum - sum(ordered[i] for i in left)
+    if remaining not in right_halves:
+      continue
+    candidates = right_halves[remaining]
+    start = bisect.bisect_right(first_indexes[remaining], left[-1])
+    for right in candidates[start:]:
+      pick = left + right
+      if _is_canonical(ordered, pick):
+        yield tuple(ordered[i] for i in pick)
+
+
+def _is_canonical(ordered, pick):
+  # With repeated values, only the pick using the leftmost copies is kept
+  chosen = set(pick)
+  for i in pick:
+    if i > 0 and ordered[i] == ordered[i - 1] and i - 1 not in chosen:
+      return False
+  return True
 
 
 def find_sum_set(values, expected_sum, n_elements):
@@ -7,12 +106,46 @@ def find_sum_set(values, expected_sum, n_elements):
   Given a list of values, returns the product of the first n_elements found
   that sum expected_sum
   """
+  pick = next(k_sum(values, expected_sum, n_elements), None)
+  if pick is not None:
+    return math.prod(pick)
+
+
+def find_sum_set_combinations(values, expected_sum, n_elements):
+  """
+  Brute force version of find_sum_set. Kept as a reference for benchmarking.
+  """
   for pick in itertools.combinations(values, n_elements):
     if (sum(pick)) == expected_sum:
       return math.prod(pick)
 
 
+def benchmark(sizes=(100, 200, 400), n_elements=(2, 3), seed=0):
+  """
+  Compares k_sum against the combinations scan on synthetic reports. The
+  expected sum is unreachable so both methods have to go through the whole
+  search space.
+  """
+  rng = random.Random(seed)
+  for size in sizes:
+    values = [rng.randrange(1, 10 ** 6) * 2 for _ in range(size)]
+    for k in n_elements:
+      start = time.perf_counter()
+      find_sum_set_combinations(values, 1, k)
+      naive = time.perf_counter() - start
+
+      start = time.perf_counter()
+      list(k_sum(values, 1, k))
+      engine = time.perf_counter() - start
+
+      print(f"size={size} k={k} combinations={naive:.4f}s k_sum={engine:.4f}s")
+
+
 if __name__ == "__main__":
+  if "--benchmark" in sys.argv:
+    benchmark()
+    exit()
+
   values = []
   with open("../data/01.txt") as fi:
     values = [int(v) for v in fi.readlines()]
@@ -20,13 +20,12 @@ class CircularMap:
 
 
   def move(self, h, v):
-    self.position.x = (self.position.x + h) % self.grid.shape[1]
-
     if (self.position.y + v) < 0 or \
        (self.position.y + v) >= self.grid.shape[0]:
       raise ValueError("Illegal move")
 
-    self.position.y = (self.position.y + v)
+    self.position = Point((self.position.x + h) % self.grid.shape[1],
+                          self.position.y + v)
 
 
   def has_tree(self):
@@ -30,31 +30,55 @@ def read_boarding_passes(filename):
     return plist
 
 
-def find_my_seat(plist):
+# F and L select the lower half (bit 0), B and R the upper half (bit 1)
+SEAT_BITS = bytes.maketrans(b"FLBR", b"\x00\x00\x01\x01")
+
+
+def decode_boarding_passes(filename, row_bits=7, col_bits=3):
     """
-    Finds the only empty seat in the middle of the plane, excluding
-    leading and trailing empty seats.
+    Decodes a whole file of boarding passes at once. A pass is just a binary
+    number written with F/L as 0 and B/R as 1, where the first row_bits are
+    the row and the last col_bits the column.
+
+    Returns NumPy arrays with the rows, columns and ids of the passes.
     """
-    available_seats = 2 ** 7 * 8
-    seats = np.zeros(available_seats, dtype=int)
+    with open(filename, "rb") as fi:
+        lines = fi.read().split()
+
+    width = row_bits + col_bits
+    bits = np.frombuffer(b"".join(lines).translate(SEAT_BITS), dtype=np.uint8)
+    if any(len(line) != width for line in lines) or bits.max(initial=0) > 1:
+        raise ValueError(f"Boarding passes must be {width} characters of F, B, L or R")
+
+    weights = 1 << np.arange(width - 1, -1, -1, dtype=np.int64)
+    ids = bits.reshape(-1, width) @ weights
+    rows = ids >> col_bits
+    cols = ids & ((1 << col_bits) - 1)
 
-    for p in plist:
-        seats[p.id] = 1
+    return rows, cols, ids
+
+
+def find_my_seat(seat_ids, row_bits=7, col_bits=3):
+    """
+    Finds the only empty seat in the middle of the plane, excluding
+    leading and trailing empty seats. Takes seat ids or BoardingPass objects.
+    """
+    if not isinstance(seat_ids, np.ndarray):
+        seat_ids = [s.id if isinstance(s, BoardingPass) else s for s in seat_ids]
+    available_seats = 2 ** (row_bits + col_bits)
+    seats = np.bincount(np.asarray(seat_ids, dtype=np.int64), minlength=available_seats) > 0
 
-    for i in range(1, len(seats)-1):
-        if seats[i] != 0:
-            continue
-        if seats[i - 1] != 1 or seats[i + 1] != 1:
-            continue
-        return i
+    gaps = np.flatnonzero(~seats[1:-1] & seats[:-2] & seats[2:])
+    if gaps.size:
+        return int(gaps[0]) + 1
 
 
 if __name__ == "__main__":
-    boarding_passes = read_boarding_passes("../data/05_full.txt")
+    rows, cols, ids = decode_boarding_passes("../data/05_full.txt")
 
     # First half
-    print(max(p.id for p in boarding_passes))
+    print(ids.max())
 
     # Second half
-    my_seat = find_my_seat(boarding_passes)
+    my_seat = find_my_seat(ids)
     print(my_seat)
@@ -1,29 +1,59 @@
+from functools import reduce
+from operator import and_, or_
 from typing import List
+import numpy as np
 from common import split
 
+# Answers are the letters a-z, stored as bits 0-25 of an integer mask
+LETTER_BITS = {chr(ord("a") + i): 1 << i for i in range(26)}
+
+
+def answers_to_mask(answers):
+    mask = 0
+    for a in answers:
+        mask |= LETTER_BITS[a]
+    return mask
+
+
+def mask_to_answers(mask):
+    return {a for a, bit in LETTER_BITS.items() if mask & bit}
+
+
+def popcount(masks):
+    """
+    Number of bits set in each element of a uint32 array
+    """
+    v = masks.astype(np.uint32)
+    v = v - ((v >> 1) & 0x55555555)
+    v = (v & 0x33333333) + ((v >> 2) & 0x33333333)
+    v = (v + (v >> 4)) & 0x0F0F0F0F
+    return (v * 0x01010101) >> 24
+
 
 class CustomForm:
     def __init__(self, answers):
-        self.answers = set(answers)
+        self.mask = answers_to_mask(answers)
+
+    @property
+    def answers(self):
+        return mask_to_answers(self.mask)
 
 
 class CustomFormGroup:
     def __init__(self, forms: List[CustomForm]):
         self.forms = forms
 
-    def union_answers(self):
-        acum = self.forms[0].answers
-        for form in self.forms[1:]:
-            acum = acum.union(form.answers)
+    def union_mask(self):
+        return reduce(or_, (form.mask for form in self.forms))
 
-        return acum
+    def intersection_mask(self):
+        return reduce(and_, (form.mask for form in self.forms))
 
-    def intersection_answers(self):
-        acum = self.forms[0].answers
-        for form in self.forms[1:]:
-            acum = acum.intersection(form.answers)
+    def union_answers(self):
+        return mask_to_answers(self.union_mask())
 
-        return acum
+    def intersection_answers(self):
+        return mask_to_answers(self.intersection_mask())
 
 
 def parse_custom_forms(filename) -> List[CustomFormGroup]:
@@ -35,11 +65,41 @@ def parse_custom_forms(filename) -> List[CustomFormGroup]:
         return group_list
 
 
+def parse_custom_form_masks(filename):
+    """
+    Streams the forms file into a packed representation: a uint32 array with
+    one answer mask per person and the offsets where each group starts.
+    """
+    masks = []
+    offsets = []
+    new_group = True
+    with open(filename) as fi:
+        for line in fi:
+            answers = line.strip()
+            if not answers:
+                new_group = True
+                continue
+            if new_group:
+                offsets.append(len(masks))
+                new_group = False
+            masks.append(answers_to_mask(answers))
+
+    return np.array(masks, dtype=np.uint32), np.array(offsets, dtype=np.intp)
+
+
+def count_union_answers(masks, offsets):
+    return popcount(np.bitwise_or.reduceat(masks, offsets))
+
+
+def count_intersection_answers(masks, offsets):
+    return popcount(np.bitwise_and.reduceat(masks, offsets))
+
+
 if __name__ == "__main__":
-    groups = parse_custom_forms("../data/06_full.txt")
+    masks, offsets = parse_custom_form_masks("../data/06_full.txt")
 
-    solution = sum(len(g.union_answers()) for g in groups)
+    solution = count_union_answers(masks, offsets).sum()
     print(solution)
 
-    solution_all = sum(len(g.intersection_answers()) for g in groups)
+    solution_all = count_intersection_answers(masks, offsets).sum()
     print(solution_all)
@@ -1,5 +1,5 @@
+from collections import deque
 from dataclasses import dataclass
-import networkx as nx
 
 
 @dataclass
@@ -14,54 +14,101 @@ class BagGroup:
 
 
 class BagRegulations:
+    """
+    Rules are stored as a DAG with integer node ids. contains[i] lists the
+    (node, amount) pairs bag i holds and contained_in[i] the reverse edges.
+    """
     def __init__(self):
-        self.dependencies = nx.DiGraph()
+        self.names = []
+        self.node_ids = {}
+        self.contains = []
+        self.contained_in = []
+        self._inside_cache = {}
 
     def add_bags(self, bag_list):
-        curr_nodes = self.dependencies.nodes
-        self.dependencies.add_nodes_from([bag.id for bag in bag_list if bag.id not in curr_nodes])
+        for bag in bag_list:
+            self._node(bag.id)
+
+    def _node(self, name):
+        if name not in self.node_ids:
+            self.node_ids[name] = len(self.names)
+            self.names.append(name)
+            self.contains.append([])
+            self.contained_in.append([])
+        return self.node_ids[name]
 
     def add_rule(self, rule):
         container, contains = parse_rule(rule)
 
         self.add_bags([container] + contains)
 
+        source = self.node_ids[container.id]
         for bag in contains:
-            self.dependencies.add_edge(container.id, bag.id, amount=bag.amount)
-
-    def find_containers(self, bag_type):
-        self._add_root_node()
+            target = self.node_ids[bag.id]
+            self.contains[source].append((target, bag.amount))
+            self.contained_in[target].append(source)
 
-        paths = nx.algorithms.all_simple_paths(self.dependencies, "root", "shiny_gold")
-        resulting_bags = set()
-        for p in paths:
-            for item in p:
-                if item not in ["root", bag_type]:
-                    resulting_bags.add(item)
+        self._inside_cache.clear()
 
-        self.dependencies.remove_node("root")
-        return resulting_bags
-
-    def _add_root_node(self):
-        self.dependencies.add_node("root")
-        for node in self.dependencies.nodes:
-            predecessors = list(self.dependencies.predecessors(node))
-            if not predecessors:
-                self.dependencies.add_edge("root", node)
+    def find_containers(self, bag_type):
+        """
+        Bags that can eventually contain bag_type: a BFS over reverse edges
+        """
+        start = self.node_ids[bag_type]
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for parent in self.contained_in[node]:
+                if parent not in seen:
+                    seen.add(parent)
+                    queue.append(parent)
+
+        seen.remove(start)
+        return {self.names[n] for n in seen}
 
     def count_bags_inside(self, bag_type):
-        bags_in = list(self.dependencies.successors(bag_type))
-        # Base case: Does not contain anything
-        if not bags_in:
-            return 0
-        # Recursive case: bags= edge * contents_inside(destination) for edge in children(bag_type)
-        else:
-            value = 0
-            for b in bags_in:
-                n_bags = self.dependencies.get_edge_data(bag_type, b)["amount"]
-                value += self.count_bags_inside(b) * n_bags + n_bags
-
-            return value
+        """
+        Total number of bags inside bag_type. Results for every bag visited
+        are cached, so repeated queries share the work on common sub-DAGs.
+        """
+        cache = self._inside_cache
+        expanded = set()
+        stack = [self.node_ids[bag_type]]
+        while stack:
+            node = stack[-1]
+            if node in cache:
+                stack.pop()
+                continue
+
+            pending = [child for child, _ in self.contains[node] if child not in cache]
+            if pending:
+                if node in expanded:
+                    raise ValueError(f"Circular rule found for {self.names[node]}")
+                expanded.add(node)
+                stack.extend(pending)
+                continue
+
+            cache[node] = sum(amount * (cache[child] + 1) for child, amount in self.contains[node])
+            stack.pop()
+
+        return cache[self.node_ids[bag_type]]
+
+    def to_networkx(self):
+        """
+        Exports the rules as a networkx DiGraph with amounts as edge data
+        """
+        try:
+            import networkx as nx
+        except ImportError as e:
+            raise ImportError("networkx is needed to export the regulations") from e
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.names)
+        for source, edges in enumerate(self.contains):
+            for target, amount in edges:
+                graph.add_edge(self.names[source], self.names[target], amount=amount)
+        return graph
 
 
 def parse_rule(r):
@@ -1,6 +1,10 @@
+from array import array
 from dataclasses import dataclass, field
 from typing import List
 from enum import Enum
+import random
+import sys
+import time
 
 
 class ExecutionCode(Enum):
@@ -83,6 +87,150 @@ class GameBoy:
             return True
         return False
 
+    def compile(self):
+        return CompiledBootCode.from_operations(self.boot_code)
+
+
+NOP, ACC, JMP = 0, 1, 2
+OPCODES = {"nop": NOP, "acc": ACC, "jmp": JMP}
+
+
+@dataclass
+class CompiledBootCode:
+    """
+    Boot code as two parallel integer arrays, for fast execution.
+    """
+    opcodes: array
+    arguments: array
+
+    @classmethod
+    def from_operations(cls, operations):
+        opcodes = array("b", (OPCODES[op.code] for op in operations))
+        arguments = array("q", (op.value for op in operations))
+        return cls(opcodes, arguments)
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def run(self):
+        """
+        Runs the code from the start. Returns the ExecutionCode that stopped
+        the program, the accumulator and the number of executed instructions.
+        """
+        opcodes = self.opcodes
+        arguments = self.arguments
+        n = len(opcodes)
+        executed = bytearray(n)
+        accumulator = 0
+        inst_pointer = 0
+        steps = 0
+
+        if n == 0:
+            return ExecutionCode.END_OF_PROGRAM, accumulator, steps
+
+        while True:
+            if executed[inst_pointer]:
+                return ExecutionCode.REPEATED_OPERATION, accumulator, steps
+            executed[inst_pointer] = 1
+            steps += 1
+
+            op = opcodes[inst_pointer]
+            if op == JMP:
+                inst_pointer += arguments[inst_pointer]
+                if inst_pointer == n:
+                    return ExecutionCode.END_OF_PROGRAM, accumulator, steps
+                if inst_pointer < 0 or inst_pointer > n:
+                    return ExecutionCode.OUT_OF_MEMORY, accumulator, steps
+            else:
+                if op == ACC:
+                    accumulator += arguments[inst_pointer]
+                inst_pointer += 1
+                if inst_pointer == n:
+                    return ExecutionCode.END_OF_PROGRAM, accumulator, steps
+
+    def _next_pointer(self, index, flipped=False):
+        op = self.opcodes[index]
+        if flipped:
+            op = {NOP: JMP, JMP: NOP}.get(op, op)
+        if op == JMP:
+            return index + self.arguments[index]
+        return index + 1
+
+    def terminating_instructions(self):
+        """
+        Marks the instructions from which the program ends. The control flow
+        graph is built once in CSR form with reverse edges, and a BFS walks it
+        back from the instructions that jump to the end of the program.
+        """
+        n = len(self)
+        targets = array("q", (self._next_pointer(i) for i in range(n)))
+
+        # Reverse edges: sources[offsets[t]:offsets[t + 1]] jump into t
+        offsets = array("q", bytes(8 * (n + 1)))
+        for t in targets:
+            if 0 <= t < n:
+                offsets[t + 1] += 1
+        for t in range(n):
+            offsets[t + 1] += offsets[t]
+        sources = array("q", bytes(8 * offsets[n]))
+        fill = array("q", offsets)
+        for i, t in enumerate(targets):
+            if 0 <= t < n:
+                sources[fill[t]] = i
+                fill[t] += 1
+
+        terminates = bytearray(n)
+        queue = [i for i, t in enumerate(targets) if t == n]
+        for i in queue:
+            terminates[i] = 1
+        while queue:
+            t = queue.pop()
+            for i in sources[offsets[t]: offsets[t + 1]]:
+                if not terminates[i]:
+                    terminates[i] = 1
+                    queue.append(i)
+
+        return terminates
+
+    def repair(self):
+        """
+        Finds the nop/jmp that has to be flipped for the program to end.
+        Returns the accumulator of the patched program and the flipped index,
+        or None if no single flip works. If the program already ends, the
+        index is None.
+        """
+        n = len(self)
+        terminates = self.terminating_instructions()
+        if n == 0 or terminates[0]:
+            _, accumulator, _ = self.run()
+            return accumulator, None
+
+        # Walk the original path: it loops, so it visits at most n instructions
+        visited = bytearray(n)
+        accumulator = 0
+        inst_pointer = 0
+        while 0 <= inst_pointer < n and not visited[inst_pointer]:
+            visited[inst_pointer] = 1
+            if self.opcodes[inst_pointer] != ACC:
+                target = self._next_pointer(inst_pointer, flipped=True)
+                if target == n or (0 <= target < n and terminates[target]):
+                    return accumulator + self._run_from(target), inst_pointer
+            else:
+                accumulator += self.arguments[inst_pointer]
+            inst_pointer = self._next_pointer(inst_pointer)
+
+        return None
+
+    def _run_from(self, inst_pointer):
+        # Accumulated value from inst_pointer to the end of the program. Only
+        # called on instructions that are known to terminate.
+        accumulator = 0
+        while inst_pointer != len(self):
+            if self.opcodes[inst_pointer] == ACC:
+                accumulator += self.arguments[inst_pointer]
+            inst_pointer = self._next_pointer(inst_pointer)
+        return accumulator
+
 
 class GameBoyFactory:
     def __init__(self, a_game_boy):
@@ -96,6 +244,33 @@ class GameBoyFactory:
             self.game_boy.reset()
 
 
+def benchmark(sizes=(10 ** 4, 10 ** 5, 10 ** 6), seed=0):
+    """
+    Instructions per second of GameBoy.run against CompiledBootCode.run on
+    synthetic programs that run every instruction once and then terminate.
+    """
+    rng = random.Random(seed)
+    for size in sizes:
+        operations = []
+        for _ in range(size):
+            code = rng.choice(["nop", "acc", "jmp"])
+            value = rng.randint(-50, 50) if code == "acc" else 1
+            operations.append(Operation(code=code, value=value))
+        game_boy = GameBoy(boot_code=operations)
+
+        start = time.perf_counter()
+        game_boy.run()
+        interpreted = size / (time.perf_counter() - start)
+
+        compiled_code = game_boy.compile()
+        start = time.perf_counter()
+        _, accumulator, steps = compiled_code.run()
+        compiled = steps / (time.perf_counter() - start)
+
+        assert accumulator == game_boy.accumulator
+        print(f"size={size} interpreted={interpreted:,.0f} ins/s compiled={compiled:,.0f} ins/s")
+
+
 def read_boot_code(filename):
     op_list = []
     with open(filename) as fi:
@@ -112,14 +287,14 @@ def parse_operation(line):
 
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        exit()
+
     game_boy = read_boot_code("../data/08_full.txt")
 
     code = game_boy.run()
     print(game_boy.accumulator)
 
-    game_boy.reset()
-    factory = GameBoyFactory(game_boy)
-    for gb in factory:
-        code = gb.run()
-        if code == ExecutionCode.END_OF_PROGRAM:
-            print(gb.accumulator)
+    accumulator, flipped_index = game_boy.compile().repair()
+    print(accumulator)
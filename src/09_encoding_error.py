@@ -1,6 +1,7 @@
-import itertools
+from collections import Counter
 from dataclasses import dataclass
 from typing import List
+import numpy as np
 
 
 @dataclass
@@ -8,29 +9,59 @@ class XMASValidator:
     values: List[int]
     window: List[int]
 
+    def __post_init__(self):
+        # The window is used as a ring buffer: _oldest points to the value
+        # that is replaced next. _counts is the multiset of the window values,
+        # so validating a number only needs one pass over the distinct values.
+        self.window = list(self.window)
+        self._oldest = 0
+        self._counts = Counter(self.window)
+
     def add_number(self, n):
         if self.is_valid(n):
-            self.window = self.window[1:] + [n]
+            self._push(n)
             return True
         else:
             return False
 
+    def _push(self, n):
+        old = self.window[self._oldest]
+        self._counts[old] -= 1
+        if self._counts[old] == 0:
+            del self._counts[old]
+        self._counts[n] += 1
+
+        self.window[self._oldest] = n
+        self._oldest = (self._oldest + 1) % len(self.window)
+
     def is_valid(self, n):
-        for pick in itertools.combinations(self.window, 2):
-            if len(set(pick)) == len(pick) and sum(pick) == n:
+        counts = self._counts
+        for v in counts:
+            complement = n - v
+            if complement != v and complement in counts:
                 return True
         return False
 
-    def find_contiguous_sum(self, n):
-        for i in range(len(self.values)):
-            sum_values = self.contiguous_sum_ahead(i, n)
-            if sum_values:
-                return sum_values
+    def find_contiguous_sum(self, n, mode="two_pointer"):
+        """
+        Returns the first contiguous run of at least two values that sums n.
+        "two_pointer" only works for non-negative values, "prefix_sum" works
+        for any values.
+        """
+        if mode == "two_pointer":
+            span = contiguous_sum_two_pointer(self.values, n)
+        elif mode == "prefix_sum":
+            span = contiguous_sum_prefix(self.values, n)
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+
+        if span:
+            return self.values[span[0]: span[1]]
 
     def contiguous_sum_ahead(self, start, n):
         accum = 0
         i = start
-        while accum < n and i <= len(self.values):
+        while accum < n and i < len(self.values):
             accum += self.values[i]
             i += 1
 
@@ -40,6 +71,62 @@ class XMASValidator:
             return None
 
 
+def iter_chunks(values, chunk_size=1 << 20):
+    """
+    Yields (offset, list of ints) chunks of values. Slicing a NumPy array or a
+    memory-mapped file only reads chunk_size values at a time.
+    """
+    for offset in range(0, len(values), chunk_size):
+        chunk = values[offset: offset + chunk_size]
+        if isinstance(chunk, np.ndarray):
+            chunk = chunk.tolist()
+        yield offset, chunk
+
+
+def contiguous_sum_two_pointer(values, n, chunk_size=1 << 20):
+    """
+    Sliding window over non-negative values. Returns (start, end) of the first
+    window of length >= 2 that sums n, or None.
+    """
+    start = 0
+    accum = 0
+    for offset, chunk in iter_chunks(values, chunk_size):
+        for i, v in enumerate(chunk, offset):
+            if v < 0:
+                raise ValueError(f"Negative value {v} at {i}, use the prefix_sum mode")
+            accum += v
+            while accum > n and start < i:
+                accum -= int(values[start])
+                start += 1
+            if accum == n and i > start:
+                return start, i + 1
+    return None
+
+
+def contiguous_sum_prefix(values, n, chunk_size=1 << 20):
+    """
+    Prefix sums with a hash map from each prefix sum to the first index where
+    it appears. Returns (start, end) of the first window of length >= 2 that
+    sums n, or None.
+    """
+    first_seen = {}
+    prefix = 0
+    lagging_prefix = None
+    end = 0
+    for _, chunk in iter_chunks(values, chunk_size):
+        for v in chunk:
+            # Prefixes are made available one step late so that windows
+            # always contain at least two values
+            if lagging_prefix is not None:
+                first_seen.setdefault(lagging_prefix, end - 1)
+            lagging_prefix = prefix
+            prefix += v
+            end += 1
+            start = first_seen.get(prefix - n)
+            if start is not None:
+                return start, end
+    return None
+
 
 def read_input_data(filename):
     with open(filename) as fi:
@@ -47,6 +134,17 @@ def read_input_data(filename):
         return values
 
 
+def read_input_array(filename):
+    return np.loadtxt(filename, dtype=np.int64, ndmin=1)
+
+
+def open_input_memmap(filename):
+    """
+    Opens a binary file of native int64 values without loading it in memory
+    """
+    return np.memmap(filename, dtype=np.int64, mode="r")
+
+
 if __name__ == "__main__":
     values = read_input_data("../data/09_full.txt")
 
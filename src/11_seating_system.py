@@ -1,13 +1,29 @@
 import numpy as np
 
+DIRECTIONS = [(r, c) for r in [-1, 0, 1] for c in [-1, 0, 1] if r != 0 or c != 0]
+
 
 class SeatLayout:
+    """
+    The layout is stored as two boolean arrays: seats marks the cells that
+    are not floor and occupied the seats that are taken.
+    """
     OCCUPIED = "#"
     EMPTY = "L"
     FLOOR = "."
 
     def __init__(self, layout):
-        self.layout = np.array(layout, dtype=str)
+        chars = np.array(layout, dtype=str)
+        self.seats = chars != self.FLOOR
+        self.occupied = chars == self.OCCUPIED
+        self._neighbor_index = {}
+
+    @property
+    def layout(self):
+        chars = np.full(self.seats.shape, self.FLOOR)
+        chars[self.seats] = self.EMPTY
+        chars[self.occupied] = self.OCCUPIED
+        return chars
 
     def __str__(self):
         s = ""
@@ -16,8 +32,12 @@ class SeatLayout:
         return s
 
     def get(self, row, col):
-        if 0 <= row < self.layout.shape[0] and 0 <= col < self.layout.shape[1]:
-            return self.layout[row, col]
+        if 0 <= row < self.seats.shape[0] and 0 <= col < self.seats.shape[1]:
+            if self.occupied[row, col]:
+                return self.OCCUPIED
+            elif self.seats[row, col]:
+                return self.EMPTY
+            return self.FLOOR
 
     def get_neighborhood(self, row, col):
         neighborhood = []
@@ -52,22 +72,145 @@ class SeatLayout:
 
         return seat
 
+    def count_occupied_neighbors(self):
+        """
+        Occupied neighbors of every cell, as a sum of the 8 shifted slices of
+        the zero-padded occupied array.
+        """
+        rows, cols = self.occupied.shape
+        padded = np.pad(self.occupied.astype(np.int8), 1)
+        counts = np.zeros((rows, cols), dtype=np.int8)
+        for r, c in DIRECTIONS:
+            counts += padded[1 + r: 1 + r + rows, 1 + c: 1 + c + cols]
+        return counts
+
+    def first_seats(self, row_increment, col_increment, sight=True):
+        """
+        For every cell, the id of the first seat found moving in the given
+        direction, or -1. Seat ids follow the row-major order of seats. With
+        sight=False only the adjacent cell is looked at.
+
+        Lines are swept from the far end, so every cell reuses the answer of
+        the next cell in that direction.
+        """
+        seat_ids = np.full(self.seats.shape, -1, dtype=np.int64)
+        seat_ids[self.seats] = np.arange(np.count_nonzero(self.seats))
+        seats = self.seats
+        if row_increment == 0:
+            # Sweep columns instead of rows
+            seat_ids, seats = seat_ids.T, seats.T
+            row_increment, col_increment = col_increment, row_increment
+
+        first = np.full(seats.shape, -1, dtype=np.int64)
+        visible = np.where(seats, seat_ids, -1)
+        n_lines = seats.shape[0]
+        sweep = range(n_lines - 2, -1, -1) if row_increment == 1 else range(1, n_lines)
+        for line in sweep:
+            ahead = visible[line + row_increment]
+            if col_increment == 1:
+                first[line, :-1] = ahead[1:]
+            elif col_increment == -1:
+                first[line, 1:] = ahead[:-1]
+            else:
+                first[line] = ahead
+            if sight:
+                visible[line] = np.where(seats[line], seat_ids[line], first[line])
+
+        if seats is not self.seats:
+            first = first.T
+        return first
+
+    def neighbor_index(self, mode):
+        """
+        CSR-style index of the seats each seat looks at: the neighbors of
+        seat i are indices[indptr[i]:indptr[i + 1]]. The index only depends
+        on where the floor is, so it is computed once per mode.
+        """
+        if mode not in self._neighbor_index:
+            sight = mode == "sight"
+            targets = np.stack([self.first_seats(r, c, sight=sight)[self.seats] for r, c in DIRECTIONS], axis=1)
+            found = targets >= 0
+            indptr = np.zeros(len(targets) + 1, dtype=np.int64)
+            np.cumsum(found.sum(axis=1), out=indptr[1:])
+            self._neighbor_index[mode] = (indptr, targets[found])
+        return self._neighbor_index[mode]
+
+    def count_occupied_in_sight(self, occupied_seats):
+        """
+        Occupied seats in sight of every seat, given the occupancy of the
+        seats in seat id order.
+        """
+        return self._count_occupied_seats(occupied_seats, "sight")
+
+    def _count_occupied_seats(self, occupied_seats, mode):
+        indptr, indices = self.neighbor_index(mode)
+        # A trailing 0 makes reduceat work on seats at the end that see nothing
+        values = np.append(occupied_seats[indices].astype(np.int8), 0)
+        counts = np.add.reduceat(values, indptr[:-1])
+        counts[indptr[:-1] == indptr[1:]] = 0
+        return counts
+
     def update(self, mode="neighbors"):
-        new_layout = np.zeros_like(self.layout, dtype=str)
-
-        for row, row_values in enumerate(self.layout):
-            for col, value in enumerate(row_values):
-                if mode == "neighbors":
-                    new_layout[row, col] = self.next_value(value, self.get_neighborhood(row, col))
-                elif mode == "sight":
-                    new_layout[row, col] = self.next_value(value, self.get_seats_in_sight(row, col), occupied_threshold=5)
-
-        comparison = self.layout == new_layout
-        if comparison.all():
-            return False
-        else:
-            self.layout = new_layout
+        if mode == "neighbors":
+            counts = self.count_occupied_neighbors()
+            new_occupied = self.seats & next_occupied(self.occupied, counts, 4)
+
+            if np.array_equal(self.occupied, new_occupied):
+                return False
+            self.occupied = new_occupied
             return True
+        elif mode == "sight":
+            occupied_seats = self.occupied[self.seats]
+            counts = self.count_occupied_in_sight(occupied_seats)
+            new_occupied = next_occupied(occupied_seats, counts, 5)
+
+            if np.array_equal(occupied_seats, new_occupied):
+                return False
+            self.occupied[self.seats] = new_occupied
+            return True
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+
+    def simulate(self, mode="neighbors"):
+        """
+        Runs update until the layout is stable, re-evaluating only the seats
+        whose neighborhood changed in the previous generation. Occupied
+        neighbor counts are kept up to date from the seats that change.
+
+        Returns the number of seats that changed in each generation.
+        """
+        thresholds = {"neighbors": 4, "sight": 5}
+        if mode not in thresholds:
+            raise ValueError(f"Unknown mode: {mode}")
+
+        indptr, indices = self.neighbor_index(mode)
+        occupied = self.occupied[self.seats]
+        counts = self._count_occupied_seats(occupied, mode)
+        dirty = np.arange(len(occupied))
+
+        changes = []
+        while dirty.size:
+            new_occupied = next_occupied(occupied[dirty], counts[dirty], thresholds[mode])
+            changed = dirty[new_occupied != occupied[dirty]]
+            if not changed.size:
+                break
+            occupied[changed] = ~occupied[changed]
+
+            # Seeing is symmetric, so the seats affected by a change are the
+            # neighbors of the changed seat in the same index
+            neighbors, lengths = csr_rows(indptr, indices, changed)
+            delta = np.where(occupied[changed], 1, -1).astype(counts.dtype)
+            counts += np.bincount(neighbors, weights=np.repeat(delta, lengths),
+                                  minlength=len(counts)).astype(counts.dtype)
+
+            dirty_mask = np.zeros(len(occupied), dtype=bool)
+            dirty_mask[changed] = True
+            dirty_mask[neighbors] = True
+            dirty = np.flatnonzero(dirty_mask)
+            changes.append(len(changed))
+
+        self.occupied[self.seats] = occupied
+        return changes
 
     def next_value(self, value, neighbors, occupied_threshold=4):
         if value == self.EMPTY:
@@ -81,10 +224,28 @@ class SeatLayout:
         return value
 
     def empty_seats(self):
-        return str(self).count(self.EMPTY)
+        return int(np.count_nonzero(self.seats & ~self.occupied))
 
     def occupied_seats(self):
-        return str(self).count(self.OCCUPIED)
+        return int(np.count_nonzero(self.occupied))
+
+
+def next_occupied(occupied, counts, occupied_threshold):
+    # Empty seats with no occupied neighbors get taken and occupied seats
+    # with too many occupied neighbors are freed
+    return np.where(occupied, counts < occupied_threshold, counts == 0)
+
+
+def csr_rows(indptr, indices, rows):
+    """
+    Concatenated entries of the given rows of a CSR index, and the length of
+    each row.
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    row_offsets = np.cumsum(lengths) - lengths
+    positions = np.repeat(starts - row_offsets, lengths) + np.arange(lengths.sum())
+    return indices[positions], lengths
 
 
 def read_seat_layout(filename):
@@ -1,6 +1,10 @@
 from dataclasses import dataclass
+from functools import reduce
 from common import Point
 from typing import List
+import numpy as np
+
+UNIT_VECTORS = {"N": (0, 1), "S": (0, -1), "E": (1, 0), "W": (-1, 0)}
 
 
 @dataclass
@@ -75,10 +79,9 @@ class WaypointShip(Ship):
             self._move_waypoint(direction, value)
 
     def _move_forward(self, times):
-        for i in range(times):
-            diff = self.waypoint - self.position
-            self.position = self.waypoint
-            self.waypoint += diff
+        diff = self.waypoint - self.position
+        self.position += diff * times
+        self.waypoint = self.position + diff
 
     def _move_waypoint(self, direction, value):
         x_incr = 0
@@ -114,6 +117,87 @@ class NavigationInstruction:
         return cls(code, value, inst_type)
 
 
+def quarter_turns(direction, degrees):
+    # Counterclockwise quarter turns as a 2x2 integer matrix
+    steps = degrees // 90
+    if direction == "R":
+        steps = -steps
+    return np.linalg.matrix_power(np.array([[0, -1], [1, 0]], dtype=np.int64), steps % 4)
+
+
+@dataclass(frozen=True)
+class NavigationTransform:
+    """
+    Integer affine transform on the state of a ship: its position p and a
+    vector v, which is the heading of a Ship or the waypoint relative to
+    the ship for a WaypointShip.
+
+        p' = p + forward @ v + position_shift
+        v' = rotation @ v + vector_shift
+
+    Transforms of this form are closed under composition, so a whole route
+    folds into a single one.
+    """
+    forward: np.ndarray
+    rotation: np.ndarray
+    position_shift: np.ndarray
+    vector_shift: np.ndarray
+
+    @classmethod
+    def identity(cls):
+        return cls(np.zeros((2, 2), dtype=np.int64), np.eye(2, dtype=np.int64),
+                   np.zeros(2, dtype=np.int64), np.zeros(2, dtype=np.int64))
+
+    @classmethod
+    def from_instruction(cls, instruction, waypoint=False):
+        """
+        N, S, E and W move the ship, or the waypoint if waypoint is True.
+        """
+        t = cls.identity()
+        if instruction.type == "rotate":
+            return cls(t.forward, quarter_turns(instruction.code, instruction.value),
+                       t.position_shift, t.vector_shift)
+        elif instruction.code == "F":
+            return cls(instruction.value * np.eye(2, dtype=np.int64), t.rotation,
+                       t.position_shift, t.vector_shift)
+        elif instruction.code in UNIT_VECTORS:
+            shift = instruction.value * np.array(UNIT_VECTORS[instruction.code], dtype=np.int64)
+            if waypoint:
+                return cls(t.forward, t.rotation, t.position_shift, shift)
+            return cls(t.forward, t.rotation, shift, t.vector_shift)
+        else:
+            raise ValueError(f"Unknown instruction: {instruction.code}")
+
+    def then(self, other):
+        """
+        Transform that applies self and then other
+        """
+        return NavigationTransform(
+            self.forward + other.forward @ self.rotation,
+            other.rotation @ self.rotation,
+            self.position_shift + other.forward @ self.vector_shift + other.position_shift,
+            other.rotation @ self.vector_shift + other.vector_shift,
+        )
+
+    def apply(self, position: Point, vector: Point):
+        new_positions, new_vectors = self.apply_many(np.array([[position.x, position.y]]),
+                                                     np.array([[vector.x, vector.y]]))
+        return Point(*new_positions[0].tolist()), Point(*new_vectors[0].tolist())
+
+    def apply_many(self, positions, vectors):
+        """
+        Applies the transform to (N, 2) arrays of positions and vectors
+        """
+        new_positions = positions + vectors @ self.forward.T + self.position_shift
+        new_vectors = vectors @ self.rotation.T + self.vector_shift
+        return new_positions, new_vectors
+
+
+def compile_route(instructions, waypoint=False) -> NavigationTransform:
+    transforms = (NavigationTransform.from_instruction(i, waypoint) for i in instructions)
+    return reduce(NavigationTransform.then, transforms, NavigationTransform.identity())
+
+
 @dataclass
 class NavigationSystem:
     ship: Ship
@@ -129,6 +213,19 @@ class NavigationSystem:
         elif instruction.type == "rotate":
             self.ship.rotate(instruction.code, instruction.value)
 
+    def follow(self, transform):
+        if isinstance(self.ship, WaypointShip):
+            vector = self.ship.waypoint - self.ship.position
+            self.ship.position, vector = transform.apply(self.ship.position, vector)
+            self.ship.waypoint = self.ship.position + vector
+        else:
+            heading = Point(*UNIT_VECTORS[self.ship.orientation])
+            self.ship.position, heading = transform.apply(self.ship.position, heading)
+            self.ship.orientation = next(k for k, v in UNIT_VECTORS.items() if v == (heading.x, heading.y))
+
+    def follow_route(self, instructions):
+        self.follow(compile_route(instructions, waypoint=isinstance(self.ship, WaypointShip)))
+
     def distance_to_start(self):
         return self.ship.position.manhattan(self.start)
 
@@ -142,8 +239,7 @@ if __name__ == "__main__":
     instructions = read_instructions("../data/12.txt")
     ferry_navigation = NavigationSystem(Ship(position=Point(0, 0), orientation="E"))
 
-    for i in instructions:
-        ferry_navigation.update(i)
+    ferry_navigation.follow_route(instructions)
 
     manhattan_distance = ferry_navigation.distance_to_start()
     print(manhattan_distance)
@@ -153,8 +249,7 @@ if __name__ == "__main__":
         WaypointShip(position=Point(0, 0), waypoint=Point(10, 1), orientation="E")
     )
 
-    for i in instructions:
-        wp_navigation.update(i)
+    wp_navigation.follow_route(instructions)
 
     manhattan_distance = wp_navigation.distance_to_start()
     print(manhattan_distance)
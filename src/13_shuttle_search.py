@@ -1,4 +1,8 @@
 import math
+import random
+import sys
+import time
+import numpy as np
 
 
 def calculate_next_bus(buses, t):
@@ -11,6 +15,32 @@ def calculate_next_bus(buses, t):
     return best_pick[0] * (best_pick[1] - t)
 
 
+def calculate_next_buses(buses, timestamps, max_chunk_elements=1 << 22):
+    """
+    Batch version of calculate_next_bus. For each timestamp returns the bus
+    that leaves first after it and the wait time, as NumPy arrays.
+
+    Waits are computed by broadcasting timestamps against buses, in chunks of
+    at most max_chunk_elements values to bound memory.
+    """
+    buses = np.asarray(buses, dtype=np.int64)
+    if not buses.size:
+        raise ValueError("At least one bus is required")
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    best_buses = np.empty(len(timestamps), dtype=np.int64)
+    waits = np.empty(len(timestamps), dtype=np.int64)
+
+    chunk_size = max(1, max_chunk_elements // len(buses))
+    for start in range(0, len(timestamps), chunk_size):
+        t = timestamps[start: start + chunk_size, np.newaxis]
+        chunk_waits = buses - t % buses
+        best = chunk_waits.argmin(axis=1)
+        best_buses[start: start + chunk_size] = buses[best]
+        waits[start: start + chunk_size] = np.take_along_axis(chunk_waits, best[:, np.newaxis], axis=1)[:, 0]
+
+    return best_buses, waits
+
+
 def lcm(values):
     result = values[0]
     for i in values[1:]:
@@ -38,6 +68,72 @@ def calculate_periodicity(offset_list, step, offset):
     return i
 
 
+def extended_gcd(a, b):
+    """
+    Returns (g, x, y) such that a * x + b * y == g == gcd(a, b)
+    """
+    old_r, r = a, b
+    old_x, x = 1, 0
+    old_y, y = 0, 1
+    while r:
+        q = old_r // r
+        old_r, r = r, old_r - q * r
+        old_x, x = x, old_x - q * x
+        old_y, y = y, old_y - q * y
+    return old_r, old_x, old_y
+
+
+def solve_congruences(congruences):
+    """
+    Generalized Chinese Remainder Theorem. Given (remainder, modulus) pairs,
+    returns (t, period) such that every t + k * period satisfies all of them.
+    Moduli don't need to be coprime. Raises ValueError if the congruences are
+    incompatible.
+    """
+    t, period = 0, 1
+    for remainder, modulus in congruences:
+        g, x, _ = extended_gcd(period, modulus)
+        diff = remainder - t
+        if diff % g != 0:
+            raise ValueError(f"No solution: t = {t} mod {period} and t = {remainder} mod {modulus}")
+
+        # period * x = g (mod modulus), so t + period * x * diff / g matches
+        # the new congruence too
+        step = modulus // g
+        t += period * ((diff // g) * x % step)
+        period *= step
+        t %= period
+
+    return t, period
+
+
+def earliest_timestamp(offset_list):
+    """
+    Earliest t where each bus (id, offset) departs at t + offset
+    """
+    t, _ = solve_congruences([(-offset, bus) for bus, offset in offset_list])
+    return t
+
+
+def benchmark(sizes=(100, 200, 500), bits=64, seed=0):
+    """
+    Times solve_congruences on solvable schedules of random, generally not
+    coprime, bus ids of the given size in bits
+    """
+    rng = random.Random(seed)
+    for size in sizes:
+        buses = [rng.getrandbits(bits) | 1 for _ in range(size)]
+        target = rng.getrandbits(bits * 2)
+        congruences = [(target % bus, bus) for bus in buses]
+
+        start = time.perf_counter()
+        t, period = solve_congruences(congruences)
+        elapsed = time.perf_counter() - start
+
+        assert all(t % bus == r for r, bus in congruences)
+        print(f"buses={size} bits={bits} period_bits={period.bit_length()} time={elapsed:.4f}s")
+
+
 def read_input_data(filename):
     with open(filename) as fi:
         lines = fi.readlines()
@@ -46,6 +142,10 @@ def read_input_data(filename):
 
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+        exit()
+
     timestamp, values_str = read_input_data("../data/13.txt")
 
     buses_numbers = [int(v) for v in values_str.split(',') if v != 'x']
@@ -57,13 +157,7 @@ if __name__ == "__main__":
         if v != 'x':
             offsets.append((int(v), i))
 
-    # Fist step is one
-    offset = 0
-    global_period = offsets[0][0]
-
-    for i in range(1, len(offsets)):
-        offset = calculate_periodicity(offsets[0:i + 1], global_period, offset)
-        global_period = lcm([o[0] for o in offsets[0:i + 1]])
+    offset = earliest_timestamp(offsets)
 
     print("===")
     print(offset)
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
 
 
@@ -10,6 +10,27 @@ class Instruction:
 @dataclass
 class MaskInstruction(Instruction):
     value: str
+    ones: int = field(init=False)
+    floating: int = field(init=False)
+
+    def __post_init__(self):
+        self.ones, self.floating = parse_mask(self.value)
+
+    def apply(self, int_value):
+        """
+        Version 1: 0 and 1 bits overwrite the value, X bits are kept
+        """
+        return (int_value & self.floating) | self.ones
+
+    def floating_region(self, address) -> "MemoryRegion":
+        """
+        Version 2: 1 bits are set, 0 bits are kept and X bits take every
+        possible value
+        """
+        return MemoryRegion((address | self.ones) & ~self.floating, self.floating)
+
+    def floating_addresses(self, address):
+        return self.floating_region(address).addresses()
 
 
 @dataclass
@@ -18,6 +39,67 @@ class MemoryInstruction(Instruction):
     position: int
 
 
+@dataclass(frozen=True)
+class MemoryRegion:
+    """
+    The addresses a such that a & ~floating == fixed
+    """
+    fixed: int
+    floating: int
+
+    def __len__(self):
+        return 2 ** bin(self.floating).count("1")
+
+    def addresses(self):
+        return all_floating_values(self.fixed, self.floating)
+
+    def intersects(self, other):
+        return (self.fixed ^ other.fixed) & ~(self.floating | other.floating) == 0
+
+    def subtract(self, other):
+        """
+        Splits self minus other into disjoint regions
+        """
+        if not self.intersects(other):
+            return [self]
+
+        pieces = []
+        fixed = self.fixed
+        floating = self.floating
+        # Bits floating here but fixed in other: each of them gives a piece
+        # that takes the other value and can't overlap other
+        split_bits = self.floating & ~other.floating
+        while split_bits:
+            bit = split_bits & -split_bits
+            split_bits ^= bit
+            floating ^= bit
+            pieces.append(MemoryRegion(fixed | (~other.fixed & bit), floating))
+            fixed |= other.fixed & bit
+
+        return pieces
+
+
+class SymbolicMemory:
+    """
+    Version 2 memory stored as disjoint regions with a value each, so
+    floating writes never have to be expanded to single addresses. Every
+    write takes its addresses away from the regions written before.
+    """
+    def __init__(self):
+        self.regions = []
+
+    def write(self, region, value):
+        new_regions = []
+        for old_region, old_value in self.regions:
+            for piece in old_region.subtract(region):
+                new_regions.append((piece, old_value))
+        new_regions.append((region, value))
+        self.regions = new_regions
+
+    def total(self):
+        return sum(len(region) * value for region, value in self.regions)
+
+
 def parse_instruction(s) -> Instruction:
     typ, val = s.split(" = ")
     if typ == "mask":
@@ -27,47 +109,33 @@ def parse_instruction(s) -> Instruction:
         return MemoryInstruction("mem", int(val), pos)
 
 
-def mask_value(int_value, mask):
-    bin_str = bin(int_value)[2:]
-    binary_value = list('0' * (len(mask) - len(bin_str)) + bin_str)
-    # cut_mask = mask[-len(binary_value):]
-    for i, b in enumerate(mask):
-        if b != 'X':
-            binary_value[i] = b
+def parse_mask(mask):
+    """
+    Returns the integer masks of the 1 and the X bits of a mask string
+    """
+    ones = int(mask.replace("X", "0"), 2)
+    floating = int(mask.replace("1", "0").replace("X", "1"), 2)
+    return ones, floating
 
-    return int(''.join(binary_value), 2)
-
-
-def binary_generator(n):
-    for i in range(0, 2 ** n):
-        bin_val = bin(i)[2:]
-        yield "0" * (n - len(bin_val)) + bin_val
 
+def mask_value(int_value, mask):
+    ones, floating = parse_mask(mask)
+    return (int_value & floating) | ones
 
-def all_binary_values(masked_value):
-    gen = binary_generator(masked_value.count('X'))
-    result = []
-    for g in gen:
-        g_index = 0
-        new_masked_value = masked_value[:]
-        for b_index, b in enumerate(new_masked_value):
-            if b == 'X':
-                new_masked_value[b_index] = g[g_index]
-                g_index += 1
 
-        yield int(''.join(new_masked_value), 2)
+def all_floating_values(base, floating):
+    # Goes through every subset of the floating bits, from all set to none
+    subset = floating
+    while True:
+        yield base | subset
+        if subset == 0:
+            break
+        subset = (subset - 1) & floating
 
 
 def compute_all_addresses(int_value, mask):
-    # 1. Fix the corresponding 1s and 0s in the mask
-    bin_str = bin(int_value)[2:]
-    binary_value = list('0' * (len(mask) - len(bin_str)) + bin_str)
-    for i, b in enumerate(mask):
-        if b != '0':
-            binary_value[i] = b
-
-    # 2. Combinatorially fill in all possible values
-    return all_binary_values(binary_value)
+    ones, floating = parse_mask(mask)
+    return all_floating_values((int_value | ones) & ~floating, floating)
 
 
 def read_input_data(filename) -> List[Instruction]:
@@ -80,25 +148,22 @@ if __name__ == "__main__":
 
     # Version 1 decoder
     memory = {}
-    current_mask = instructions[0].value
+    current_mask = instructions[0]
     for index, instr in enumerate(instructions[1:], 1):
         if instr.type == "mask":
-            current_mask = instr.value
+            current_mask = instr
         else:
-            masked_value = mask_value(instr.value, current_mask)
-            memory[instr.position] = masked_value
+            memory[instr.position] = current_mask.apply(instr.value)
 
     print(sum(memory.values()))
 
     # Version 2 decoder
-    memory = {}
-    current_mask = instructions[0].value
+    memory = SymbolicMemory()
+    current_mask = instructions[0]
     for index, instr in enumerate(instructions[1:], 1):
         if instr.type == "mask":
-            current_mask = instr.value
+            current_mask = instr
         else:
-            all_addresses = compute_all_addresses(instr.position, current_mask)
-            for p in all_addresses:
-                memory[p] = instr.value
+            memory.write(current_mask.floating_region(instr.position), instr.value)
 
-    print(sum(memory.values()))
+    print(memory.total())
@@ -1,23 +1,43 @@
-from collections import defaultdict
+from array import array
+import sys
+import time
 
-numbers = [18, 11, 9, 0, 5, 1]
 
-seen = defaultdict(list)
-for i, n in enumerate(numbers, 1):
-    seen[n] = [i]
+def recite(numbers, turns):
+    """
+    Returns the number spoken on the given turn. Every spoken number is
+    smaller than the number of turns, so the turn where each number was last
+    seen fits in a preallocated table of 4 bytes per possible value.
+    """
+    if turns <= len(numbers):
+        return numbers[turns - 1]
 
-last_number_spoken = numbers[-1]
-recite_until = 30000000
-for turn in range(len(numbers) + 1, recite_until+1):
-    last_seen = seen.get(last_number_spoken, None)
-    if len(last_seen) == 1:
-        last_number_spoken = 0
-    else:
-        # has ben seen before
-        last_number_spoken = last_seen[-1] - last_seen[-2]
+    # 0 means never seen, turns are counted from 1
+    last_seen = array("I", bytes(4 * max(turns, max(numbers) + 1)))
+    for turn, n in enumerate(numbers[:-1], 1):
+        last_seen[n] = turn
+
+    last_number_spoken = numbers[-1]
+    for turn in range(len(numbers), turns):
+        previous = last_seen[last_number_spoken]
+        last_seen[last_number_spoken] = turn
+        last_number_spoken = turn - previous if previous else 0
+
+    return last_number_spoken
 
-    seen[last_number_spoken].append(turn)
 
-    if turn == recite_until:
-        print(f"Turn {turn}: {last_number_spoken}")
+def benchmark(numbers, turns):
+    start = time.perf_counter()
+    result = recite(numbers, turns)
+    elapsed = time.perf_counter() - start
+    print(f"Turn {turns}: {result} ({turns / elapsed:,.0f} turns/s)")
 
+
+if __name__ == "__main__":
+    numbers = [18, 11, 9, 0, 5, 1]
+    recite_until = 30000000
+
+    if "--benchmark" in sys.argv:
+        benchmark(numbers, recite_until)
+    else:
+        print(f"Turn {recite_until}: {recite(numbers, recite_until)}")
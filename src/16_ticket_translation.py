@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import List
 import math
 import re
+import numpy as np
 
 
 @dataclass
@@ -24,6 +25,42 @@ class ClosedInterval:
         return self.start <= value <= self.end
 
 
+@dataclass
+class IntervalIndex:
+    """
+    Union of closed intervals, merged into sorted disjoint [starts, ends]
+    so that membership of many values is one np.searchsorted call.
+    """
+    starts: np.ndarray
+    ends: np.ndarray
+
+    @classmethod
+    def from_intervals(cls, intervals):
+        starts = []
+        ends = []
+        for interval in sorted(intervals, key=lambda i: i.start):
+            if starts and interval.start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], interval.end)
+            else:
+                starts.append(interval.start)
+                ends.append(interval.end)
+        return cls(np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
+
+    @classmethod
+    def from_rules(cls, rules):
+        return cls.from_intervals([r for rule in rules for r in rule.valid_ranges])
+
+    def contains(self, values):
+        """
+        Boolean array telling which values fall in any interval
+        """
+        values = np.asarray(values)
+        if self.starts.size == 0:
+            return np.zeros(values.shape, dtype=bool)
+        position = np.searchsorted(self.starts, values, side="right") - 1
+        return (position >= 0) & (values <= self.ends[np.maximum(position, 0)])
+
+
 @dataclass
 class FieldRule:
     name: str
@@ -62,86 +99,115 @@ class Ticket:
 class TicketKnowledge:
     rules: List[FieldRule]
     my_ticket: Ticket
-    nearby_tickets: List[Ticket]
+    # One row per nearby ticket, one column per field
+    nearby_tickets: np.ndarray
+
+    def valid_values(self, values):
+        return IntervalIndex.from_rules(self.rules).contains(values)
 
     @property
     def scanning_error_rate(self):
-        ser = 0
-        for ticket in self.nearby_tickets:
-            ser += sum([t.value for t in ticket.validate(self.rules)])
-        return ser
+        values = self.nearby_tickets
+        return int(values[~self.valid_values(values)].sum())
 
     def discard_invalid(self):
-        new_ticket_list = []
-        for ticket in self.nearby_tickets:
-            if len(ticket.validate(self.rules)) == 0:
-                new_ticket_list.append(ticket)
+        valid_tickets = self.valid_values(self.nearby_tickets).all(axis=1)
+        self.nearby_tickets = self.nearby_tickets[valid_tickets]
 
-        self.nearby_tickets = new_ticket_list
+    def compatibility_matrix(self):
+        """
+        Boolean (columns, rules) array: True where every value of the column
+        satisfies the rule
+        """
+        return np.stack([IntervalIndex.from_rules([r]).contains(self.nearby_tickets).all(axis=0) for r in self.rules], axis=1)
 
     def assign_fields(self):
-        # For a given column in the nearby tickets, it can only be
-        # for a field where all the values are valid. So I go value
-        # by value and find the set of rules it matches.
-        # Get the common ones. If there are more than one, continue
-        # to the next column.
-
-        # Unassigned: column, rule
-        unassigned = list(enumerate(self.rules))  # set([r.name for r in self.rules])
-        possible_fields = {}
-        assigned_fields = {}
-
-        c = 0
-        while len(unassigned) > 0:
-            if c not in [assigned_fields.keys()]:
-                column_values = [t[c] for t in self.nearby_tickets]
-                matching_fields = self.find_matching_fields(column_values, [u[1] for u in unassigned])
-                if len(matching_fields) == 1:
-                    # Assign this one
-                    assigned_fields[c] = matching_fields[0]
-
-                    # Remove this possibility from the rest
-                    unassigned = [u for u in unassigned if u[1].name != matching_fields[0]]
-                    # Remove from the possibles, also
-                    possible_fields = self.remove_value(possible_fields, matching_fields[0])
-
-                    # While a possible field is left with length 1, assign it and try again.
-                    assignable_field = self.get_assignable_field(possible_fields)
-                    while not assignable_field is None:
-                        assigned_fields[assignable_field] = possible_fields[assignable_field][0]
-                        unassigned = [u for u in unassigned if u[1].name != possible_fields[assignable_field][0]]
-                        possible_fields = self.remove_value(possible_fields, possible_fields[assignable_field][0])
-                        assignable_field = self.get_assignable_field(possible_fields)
-
-                else:
-                    possible_fields[c] = matching_fields
-
-            c = (c+1) % len(column_values)
-
-        return assigned_fields
-
-
-    def remove_value(self, possible, value):
-        for k in possible:
-            possible[k] = [item for item in possible[k] if item != value]
-
-        return {k: possible[k] for k in possible if len(possible[k]) > 0}
-
-
-    def get_assignable_field(self, possible):
-        for k in possible:
-            if len(possible[k]) == 1:
-                return k
-        return None
+        """
+        Returns a {column: rule name} assignment. Columns that only fit one
+        rule are assigned first, and the rule is removed from the other
+        columns. If that gets stuck, the rest is solved as a bipartite
+        matching.
+        """
+        compatible = self.compatibility_matrix()
+        assigned_fields = propagate_assignments(compatible)
+
+        if len(assigned_fields) < compatible.shape[0]:
+            columns = [c for c in range(compatible.shape[0]) if c not in assigned_fields]
+            rules = [r for r in range(compatible.shape[1]) if r not in assigned_fields.values()]
+            graph = {c: [r for r in rules if compatible[c, r]] for c in columns}
+            assigned_fields.update(hopcroft_karp(graph))
+
+        if len(assigned_fields) < compatible.shape[0]:
+            raise ValueError("No assignment of rules to ticket columns satisfies all nearby tickets")
+
+        return {c: self.rules[r].name for c, r in sorted(assigned_fields.items())}
+
+
+def propagate_assignments(compatible):
+    """
+    Repeatedly assigns columns that have a single compatible rule. Returns
+    {column: rule index} of the forced assignments.
+    """
+    compatible = compatible.copy()
+    assigned = {}
+    while True:
+        candidates = compatible.sum(axis=1)
+        forced = [int(c) for c in np.flatnonzero(candidates == 1) if c not in assigned]
+        if not forced:
+            return assigned
+        for c in forced:
+            rules = np.flatnonzero(compatible[c])
+            if len(rules) != 1:
+                # Another forced column took the same rule
+                continue
+            assigned[c] = int(rules[0])
+            compatible[:, rules[0]] = False
+
+
+def hopcroft_karp(graph):
+    """
+    Maximum bipartite matching. graph maps each left node to the right
+    nodes it can be matched to. Returns {left: right} for the matched nodes.
+    """
+    match_left = {u: None for u in graph}
+    match_right = {}
+
+    def bfs():
+        distance = {}
+        queue = []
+        for u in graph:
+            if match_left[u] is None:
+                distance[u] = 0
+                queue.append(u)
+        found_free = False
+        for u in queue:
+            for v in graph[u]:
+                w = match_right.get(v)
+                if w is None:
+                    found_free = True
+                elif w not in distance:
+                    distance[w] = distance[u] + 1
+                    queue.append(w)
+        return distance if found_free else None
+
+    def dfs(u, distance):
+        for v in graph[u]:
+            w = match_right.get(v)
+            if w is None or (distance.get(w) == distance[u] + 1 and dfs(w, distance)):
+                match_left[u] = v
+                match_right[v] = u
+                return True
+        distance[u] = None
+        return False
 
+    distance = bfs()
+    while distance is not None:
+        for u in graph:
+            if match_left[u] is None and u in distance:
+                dfs(u, distance)
+        distance = bfs()
 
-    def find_matching_fields(self, field_list, possible_rules):
-        matching_fields = []
-        for r in possible_rules:
-            validations = [f.is_rule_compliant(r) for f in field_list]
-            if all(validations):
-                matching_fields.append(r.name)
-        return matching_fields
+    return {u: v for u, v in match_left.items() if v is not None}
 
 
 def read_data_info(filename):
@@ -156,7 +222,7 @@ def read_data_info(filename):
         if header != "nearby tickets:":
             raise ValueError(f"Format error. Expected header found {header}")
 
-        nearby = parse_tickets(fi)
+        nearby = parse_ticket_matrix(fi, n_fields=len(ticket.values))
 
         return TicketKnowledge(rules, ticket, nearby)
 
@@ -179,6 +245,42 @@ def parse_tickets(fi):
     return ticket_list
 
 
+def parse_ticket_matrix(fi, n_fields, chunk_lines=1 << 16):
+    """
+    Reads tickets until an empty line straight into an int64 array of shape
+    (tickets, n_fields), parsing chunk_lines lines at a time.
+    """
+    chunks = []
+    lines = []
+    for line in fi:
+        line = line.strip()
+        if not line:
+            break
+        lines.append(line)
+        if len(lines) == chunk_lines:
+            chunks.append(_parse_ticket_lines(lines, n_fields))
+            lines = []
+    chunks.append(_parse_ticket_lines(lines, n_fields))
+
+    return np.concatenate(chunks)
+
+
+def _parse_ticket_lines(lines, n_fields):
+    for line in lines:
+        if line.count(",") != n_fields - 1:
+            raise ValueError(f"Format error. Expected {n_fields} values per ticket, found {line}")
+
+    values = np.fromstring(",".join(lines), dtype=np.int64, sep=",") if lines else np.empty(0, dtype=np.int64)
+    if values.size != len(lines) * n_fields:
+        raise ValueError(f"Format error. Expected {n_fields} values per ticket")
+
+    # Values that do not fit are clipped to the int64 limits
+    limits = np.iinfo(np.int64)
+    if values.size and (values.min() == limits.min or values.max() == limits.max):
+        raise ValueError(f"Format error. Ticket values must be between {limits.min + 1} and {limits.max - 1}")
+    return values.reshape(-1, n_fields)
+
+
 if __name__ == "__main__":
     ticket_info = read_data_info("../data/16_full.txt")
 
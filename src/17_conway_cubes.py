@@ -1,17 +1,81 @@
+from collections import Counter
+from functools import lru_cache, partial
 from typing import Tuple, Set
 import itertools
+import math
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+# Packed coordinates: all of them share one signed 64 bit integer. Each one
+# takes the same number of bits, stored with a bias so that negative values fit
+PACKED_BITS = 63
+
+
+def coordinate_bits(dims):
+    bits = PACKED_BITS // dims
+    if bits < 2:
+        raise ValueError(f"Cannot pack {dims} coordinates in {PACKED_BITS} bits")
+    return bits
+
+
+def pack(cube, bits, bias):
+    key = 0
+    for i, c in enumerate(cube):
+        key += (c + bias) << (bits * i)
+    return key
+
+
+def unpack(key, dims, bits, bias):
+    mask = (1 << bits) - 1
+    return tuple(((key >> (bits * i)) & mask) - bias for i in range(dims))
 
 
 class PocketHyperDimension:
+    """
+    Active cubes are kept in a set of coordinate tuples. In "neighbors"
+    mode each candidate cube looks up its neighbors. In "counter" mode each
+    active cube adds one to the count of each of its neighbors, working on
+    coordinates packed into a single integer. The packed set is only
+    unpacked into tuples when active is read.
+    """
     ACTIVE = True
     INACTIVE = False
 
-    def __init__(self, initial_slice, dims=3):
+    def __init__(self, initial_slice, dims=3, mode="neighbors"):
+        if mode not in ("neighbors", "counter"):
+            raise ValueError(f"Unknown mode: {mode}")
+
         self.active = self.init_slice(initial_slice, dims=(dims-2))
         self.dimsize = dims
+        self.mode = mode
+
+        self.coordinate_bits = coordinate_bits(dims)
+        self.coordinate_bias = 1 << (self.coordinate_bits - 1)
+        # Furthest any coordinate is from 0. It grows by one on each step
+        self.extent = max((abs(c) for cube in self.active for c in cube), default=0)
+
+        # Adding a packed offset to a packed cube moves every coordinate at once
+        self.packed_offsets = [pack(o, self.coordinate_bits, 0)
+                               for o in itertools.product((-1, 0, 1), repeat=dims) if any(o)]
+        self.packed_active = None
+        if mode == "counter":
+            self.packed_active = {pack(c, self.coordinate_bits, self.coordinate_bias) for c in self.active}
 
         # The ones that can get activated must be neighbors of at least one
-        self.nearby_active = self.get_active_neighbors()
+        self.nearby_active = self.get_active_neighbors() if mode == "neighbors" else None
+
+    @property
+    def active(self) -> Set[Tuple]:
+        if self._active is None:
+            self._active = {unpack(cube, self.dimsize, self.coordinate_bits, self.coordinate_bias)
+                            for cube in self.packed_active}
+        return self._active
+
+    @active.setter
+    def active(self, cubes):
+        self._active = cubes
 
     def init_slice(self, s, dims) -> Set[Tuple]:
         cubes = []
@@ -50,6 +114,10 @@ class PocketHyperDimension:
             return self.INACTIVE
 
     def step(self):
+        if self.mode == "counter":
+            self._step_counter()
+            return
+
         to_deactivate = []
         to_activate = []
 
@@ -74,6 +142,143 @@ class PocketHyperDimension:
         # Nearby needs to be updated
         self.nearby_active = self.get_active_neighbors()
 
+    def _step_counter(self):
+        # Neighbors of the outermost cubes must still fit in their bits
+        if self.extent + 1 >= self.coordinate_bias:
+            raise ValueError(f"Coordinates beyond {self.coordinate_bias - 1} do not fit in "
+                             f"{self.coordinate_bits} bits")
+        self.extent += 1
+
+        active = self.packed_active
+        offsets = self.packed_offsets
+        counts = Counter(cube + offset for cube in active for offset in offsets)
+
+        self.packed_active = {cube for cube, n in counts.items() if n == 3 or (n == 2 and cube in active)}
+        self._active = None
+
+
+def box_sum(grid, axes=None):
+    """
+    Sum of every 3^d box around each cell, zero outside the grid. The box
+    is separable, so it is computed as a sum of 3 shifted slices per axis.
+    Only the given axes are summed over, all of them by default.
+    """
+    total = grid.astype(np.int16) if grid.dtype == bool else grid
+    for axis in range(total.ndim) if axes is None else axes:
+        padding = [(0, 0)] * total.ndim
+        padding[axis] = (1, 1)
+        padded = np.pad(total, padding)
+        n = total.shape[axis]
+        total = sum(np.take(padded, range(shift, shift + n), axis=axis) for shift in range(3))
+    return total
+
+
+class DenseHyperDimension:
+    """
+    Same simulation as PocketHyperDimension on a dense boolean grid that
+    grows by one cell per side on every step.
+    """
+    def __init__(self, initial_slice, dims=3):
+        grid = np.array(initial_slice, dtype=bool)
+        self.grid = grid.reshape(grid.shape + (1,) * (dims - 2))
+        self.dimsize = dims
+
+    def step(self):
+        grid = np.pad(self.grid, 1)
+        counts = box_sum(grid) - grid
+        self.grid = (counts == 3) | (grid & (counts == 2))
+
+    def count_active(self):
+        return int(np.count_nonzero(self.grid))
+
+
+@lru_cache(maxsize=None)
+def orbit_space(extra_dims, radius):
+    """
+    Canonical extra coordinates (sorted absolute values) up to radius.
+    Returns the list of them, their index, how many points of the unfolded
+    space each one stands for and the transition matrix: moves[i, j] is the
+    number of offsets in {-1, 0, 1}^extra_dims that take orbit i to orbit j.
+    """
+    orbits = list(itertools.combinations_with_replacement(range(radius + 1), extra_dims))
+    index = {w: i for i, w in enumerate(orbits)}
+
+    multiplicities = np.empty(len(orbits), dtype=np.int64)
+    for i, w in enumerate(orbits):
+        permutations = math.factorial(extra_dims)
+        for value in set(w):
+            permutations //= math.factorial(w.count(value))
+        multiplicities[i] = permutations * 2 ** sum(1 for v in w if v)
+
+    moves = np.zeros((len(orbits), len(orbits)))
+    offsets = list(itertools.product((-1, 0, 1), repeat=extra_dims))
+    for i, w in enumerate(orbits):
+        for offset in offsets:
+            target = tuple(sorted(abs(a + b) for a, b in zip(w, offset)))
+            if target in index:
+                moves[i, index[target]] += 1
+
+    return orbits, index, multiplicities, moves
+
+
+class FoldedHyperDimension:
+    """
+    Same simulation as PocketHyperDimension, using that the state stays
+    symmetric under flipping the sign of and permuting the extra
+    dimensions. Only one canonical point per orbit is stored:
+    grid[x, y, i] tells if the points with extra coordinates orbits[i]
+    are active.
+    """
+    def __init__(self, initial_slice, dims=3):
+        grid = np.array(initial_slice, dtype=bool)
+        self.grid = grid[:, :, np.newaxis]
+        self.dimsize = dims
+        self.radius = 0
+
+    def step(self):
+        extra_dims = self.dimsize - 2
+        old_orbits = orbit_space(extra_dims, self.radius)[0]
+        self.radius += 1
+        _, index, _, moves = orbit_space(extra_dims, self.radius)
+
+        rows, cols, _ = self.grid.shape
+        grid = np.zeros((rows + 2, cols + 2, len(index)), dtype=bool)
+        grid[1:-1, 1:-1, [index[w] for w in old_orbits]] = self.grid
+
+        # Active cubes around each orbit along the extra dimensions, then
+        # around each cell along x and y
+        around = np.rint(grid @ moves.T).astype(np.int16)
+        counts = box_sum(around, axes=(0, 1)) - grid
+        self.grid = (counts == 3) | (grid & (counts == 2))
+
+    def count_active(self):
+        multiplicities = orbit_space(self.dimsize - 2, self.radius)[2]
+        return int(self.grid.sum(axis=(0, 1)) @ multiplicities)
+
+
+def benchmark(initial_slice, dims_list=(3, 4, 5, 6), cycles=6, sparse_max_dims=4):
+    """
+    Time and peak memory of each engine per number of dimensions. The set
+    based PocketHyperDimension modes only run up to sparse_max_dims.
+    """
+    engines = [("dense", DenseHyperDimension), ("folded", FoldedHyperDimension),
+               ("sets", PocketHyperDimension), ("counter", partial(PocketHyperDimension, mode="counter"))]
+    for dims in dims_list:
+        for name, engine in engines:
+            if name in ("sets", "counter") and dims > sparse_max_dims:
+                continue
+            tracemalloc.start()
+            start = time.perf_counter()
+            pocket = engine(initial_slice, dims=dims)
+            for _ in range(cycles):
+                pocket.step()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            active = len(pocket.active) if name in ("sets", "counter") else pocket.count_active()
+            print(f"dims={dims} engine={name} active={active} time={elapsed:.3f}s peak_memory={peak / 2 ** 20:.1f}MiB")
+
 
 def read_input_data(filename):
     data = []
@@ -92,6 +297,10 @@ def read_input_data(filename):
 
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark(read_input_data("../data/17_full.txt"))
+        exit()
+
     my_pocket = PocketHyperDimension(read_input_data("../data/17_full.txt"), dims=3)
 
     for i in range(6):
@@ -1,7 +1,8 @@
 from dataclasses import dataclass
+import numpy as np
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Point:
     x: int
     y: int
@@ -12,10 +13,55 @@ class Point:
     def __sub__(self, other):
         return Point(self.x - other.x, self.y - other.y)
 
+    def __mul__(self, factor):
+        return Point(self.x * factor, self.y * factor)
+
+    __rmul__ = __mul__
+
     def manhattan(self, other):
         return abs(self.x - other.x) + abs(self.y - other.y)
 
 
+class PointArray:
+    """
+    Many points stored as an (N, 2) int64 array, for bulk translations and
+    distances.
+    """
+    __slots__ = ("coords",)
+
+    def __init__(self, coords):
+        self.coords = np.asarray(coords, dtype=np.int64).reshape(-1, 2)
+
+    @classmethod
+    def from_points(cls, points):
+        return cls([(p.x, p.y) for p in points])
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, i) -> Point:
+        x, y = self.coords[i].tolist()
+        return Point(x, y)
+
+    def __iter__(self):
+        for x, y in self.coords.tolist():
+            yield Point(x, y)
+
+    def _other_coords(self, other):
+        if isinstance(other, Point):
+            return np.array([other.x, other.y], dtype=np.int64)
+        return other.coords
+
+    def __add__(self, other):
+        return PointArray(self.coords + self._other_coords(other))
+
+    def __sub__(self, other):
+        return PointArray(self.coords - self._other_coords(other))
+
+    def manhattan(self, other):
+        return np.abs(self.coords - self._other_coords(other)).sum(axis=1)
+
+
 def split(sequence, sep):
     chunk = []
     for val in sequence:
@@ -0,0 +1,16 @@
+import copy
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from common import Point
+
+
+def test_point_copy_and_pickle_round_trip():
+    p = Point(1, 2)
+    assert copy.copy(p) == p
+    assert copy.deepcopy(p) == p
+    assert pickle.loads(pickle.dumps(p)) == p
+    assert not hasattr(p, "__dict__")